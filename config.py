@@ -11,9 +11,11 @@
 """
 
 import os
+import re
 import sys
 import logging
 from dotenv import load_dotenv
+from psycopg.conninfo import make_conninfo
 
 # 1. Загружаем переменные из файла .env (если он есть)
 load_dotenv()
@@ -49,16 +51,36 @@ try:
     LON = float(os.getenv("LON"))
     DAYS_BACK = int(os.getenv("DAYS_BACK", 30))
     DELAY_MINUTES = int(os.getenv("DELAY_MINUTES", 65))
+    # Каталог дискового кэша meteostat; пустое значение — кэш библиотеки
+    # по умолчанию (~/.meteostat/cache)
+    METEOSTAT_CACHE_DIR = os.getenv("METEOSTAT_CACHE_DIR")
 
     # --- Параметры базы данных ---
     POSTGRES_TABLE = os.getenv("POSTGRES_TABLE")
-    POSTGRES_CONN = {
-        "host": os.getenv("POSTGRES_HOST"),
-        "port": int(os.getenv("POSTGRES_PORT")),
-        "dbname": os.getenv("POSTGRES_DB"),
-        "user": os.getenv("POSTGRES_USER"),
-        "password": os.getenv("POSTGRES_PASSWORD"),
-    }
+    # Имя таблицы проверяется один раз здесь и экспортируется уже в виде
+    # заключенного в кавычки SQL-идентификатора: горячий путь подставляет
+    # его в запросы напрямую, без экранирования на каждом вызове
+    if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", POSTGRES_TABLE):
+        raise ValueError(
+            f"POSTGRES_TABLE содержит недопустимое имя таблицы: {POSTGRES_TABLE!r}"
+        )
+    POSTGRES_TABLE_SQL = f'"{POSTGRES_TABLE}"'
+    # DSN-строка собирается один раз при импорте: дальше psycopg получает
+    # готовую строку вместо распаковки словаря параметров на каждом connect
+    POSTGRES_DSN = make_conninfo(
+        host=os.getenv("POSTGRES_HOST"),
+        port=int(os.getenv("POSTGRES_PORT")),
+        dbname=os.getenv("POSTGRES_DB"),
+        user=os.getenv("POSTGRES_USER"),
+        password=os.getenv("POSTGRES_PASSWORD"),
+        # TCP keepalive: пауза между циклами больше часа, и без keepalive
+        # NAT/файрвол успевает молча закрыть простаивающее соединение пула,
+        # что означало бы новое рукопожатие каждый цикл
+        keepalives=1,
+        keepalives_idle=30,
+        keepalives_interval=10,
+        keepalives_count=3,
+    )
     logging.info("Конфигурация успешно загружена и валидирована.")
 
 except (ValueError, TypeError) as e:
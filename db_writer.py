@@ -6,18 +6,60 @@
 
 import logging
 from datetime import datetime
-import psycopg2
-from psycopg2.extras import execute_values
-from psycopg2.extensions import AsIs
+import numpy as np
+import psycopg
+from psycopg.errors import UniqueViolation
+from psycopg_pool import ConnectionPool
 from pandas import DataFrame
 
-from config import POSTGRES_CONN, POSTGRES_TABLE
+from config import POSTGRES_DSN, POSTGRES_TABLE_SQL
+
+# Константы бинарного формата COPY: сигнатура с полями flags и extension
+# length, завершающее слово -1 и смещение эпохи Postgres (2000-01-01)
+# относительно эпохи Unix в микросекундах.
+_COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + bytes(8)
+_COPY_TRAILER = b"\xff\xff"
+_PG_EPOCH_OFFSET_US = 946_684_800_000_000
+
+# Структура одной строки COPY BINARY под схему таблицы
+# (time timestamp, temperature real): число полей, затем длина и значение
+# каждого поля, все в big-endian.
+_ROW_DTYPE = np.dtype([
+    ('nfields', '>i2'),
+    ('time_len', '>i4'),
+    ('time', '>i8'),
+    ('temp_len', '>i4'),
+    ('temp', '>f4'),
+])
+
+
+def _configure(conn: psycopg.Connection) -> None:
+    """Настраивает новое соединение пула.
+
+    prepare_threshold = 0 заставляет psycopg готовить серверный план для
+    каждого запроса с первого же выполнения — проба MAX(time) и merge-запрос
+    переиспользуют план между циклами без повторного парсинга.
+    """
+    conn.prepare_threshold = 0
+
+
+# Пул соединений создается один раз при импорте модуля и переиспользуется
+# всеми вызовами, избавляя каждый цикл от полного TCP/auth-рукопожатия.
+# check_connection отбраковывает соединения, закрытые сервером или NAT
+# за время простоя между циклами.
+_pool = ConnectionPool(
+    POSTGRES_DSN,
+    min_size=1,
+    max_size=4,
+    configure=_configure,
+    check=ConnectionPool.check_connection,
+)
 
 
 def get_last_timestamp() -> datetime | None:
     """Получает временную метку последней записи из БД.
 
-    Устанавливает соединение с PostgreSQL и выполняет запрос на получение
+    Берет соединение с PostgreSQL из пула и выполняет запрос на получение
     максимального значения из столбца 'time'.
 
     Returns:
@@ -25,60 +67,106 @@ def get_last_timestamp() -> datetime | None:
         в противном случае None.
     """
     try:
-        with psycopg2.connect(**POSTGRES_CONN) as conn:
+        with _pool.connection() as conn:
             with conn.cursor() as cur:
-                # Используем AsIs для безопасной подстановки имени таблицы
-                cur.execute("SELECT MAX(time) FROM %s", (AsIs(POSTGRES_TABLE),))
+                # Имя таблицы — готовый идентификатор, провалидированный
+                # и заключенный в кавычки один раз при загрузке конфигурации
+                cur.execute(f"SELECT MAX(time) FROM {POSTGRES_TABLE_SQL}")
                 result = cur.fetchone()
 
                 if result and result[0]:
                     logging.info(f"Последняя запись в БД найдена: {result[0]}")
                     return result[0]
-                
+
                 logging.info("База данных пуста. Будет выполнена полная загрузка.")
                 return None
-                
-    except psycopg2.Error as e:
+
+    except psycopg.Error as e:
         logging.error(f"Ошибка при получении последней даты из БД: {e}")
         return None
 
 
-def write_data(df: DataFrame) -> None:
-    """Записывает данные из DataFrame в PostgreSQL методом пакетной вставки.
+def write_data(df: DataFrame) -> datetime | None:
+    """Записывает данные из DataFrame в PostgreSQL через COPY.
 
-    Эффективно вставляет или обновляет множество записей за один запрос,
-    используя `execute_values`. Применяет конструкцию `ON CONFLICT DO UPDATE`
-    для реализации логики "UPSERT" (обновить, если существует, иначе вставить).
+    Сначала пробует загрузить строки COPY прямо в целевую таблицу —
+    в штатном режиме пересечений по ключу нет, и это самый быстрый путь.
+    При конфликте по уникальному ключу (пересечение на граничном часе)
+    откатывается к savepoint и выполняет COPY во временную таблицу с
+    последующим merge-запросом `ON CONFLICT DO UPDATE` (логика "UPSERT").
+    Так накладные расходы ON CONFLICT не оплачиваются на каждом цикле.
 
     Args:
         df: Pandas DataFrame с данными о погоде. Ожидается, что индекс
             содержит время, а колонка 'temp' — температуру.
+
+    Returns:
+        Временная метка последней записанной строки (новый максимум
+        столбца 'time'), либо None, если писать было нечего или запись
+        не удалась. Позволяет вызывающему коду не делать отдельный
+        запрос MAX(time) после успешной записи.
     """
-    # 1. Подготовка данных: отбрасываем строки без температуры и создаем список кортежей
-    data_to_insert = [
-        (index.to_pydatetime(), float(row['temp'])) # <--- ИЗМЕНЕНИЕ ЗДЕСЬ
-        for index, row in df.dropna(subset=['temp']).iterrows()
-    ]
+    # 1. Подготовка данных: DataFrame один раз разбирается на два numpy-массива
+    # (время и температура) — дальше весь путь записи обходится без pandas.
+    times = df.index.to_numpy()
+    temps = df['temp'].to_numpy()
 
-    if not data_to_insert:
+    # Отбрасываем строки без температуры по булевой маске
+    mask = ~np.isnan(temps)
+    if not mask.any():
         logging.warning("Нет валидных данных для записи после фильтрации.")
-        return
+        return None
+    times = times[mask]
+    temps = temps[mask]
 
-    # 2. Пакетная вставка/обновление в БД
+    # Meteostat изредка отдает дубликаты временных меток на граничных часах.
+    # Индекс отсортирован по времени, поэтому достаточно оставить последнее
+    # значение каждой метки — сервер получает только уникальные ключи,
+    # и ON CONFLICT не срабатывает по строкам внутри одной загрузки.
+    if len(times) > 1:
+        keep = np.append(times[:-1] != times[1:], True)
+        times = times[keep]
+        temps = temps[keep]
+
+    # Поток COPY BINARY пакуется целиком векторизованно: один структурный
+    # массив заполняется колонками и сериализуется в байты без
+    # форматирования чисел и дат в строки и их обратного разбора сервером
+    rows = np.empty(len(times), dtype=_ROW_DTYPE)
+    rows['nfields'] = 2
+    rows['time_len'] = 8
+    rows['time'] = times.astype('datetime64[us]').view('i8') - _PG_EPOCH_OFFSET_US
+    rows['temp_len'] = 4
+    rows['temp'] = temps
+    payload = _COPY_HEADER + rows.tobytes() + _COPY_TRAILER
+
+    # 2. COPY в целевую таблицу; при конфликте — merge через временную таблицу
     try:
-        with psycopg2.connect(**POSTGRES_CONN) as conn:
+        with _pool.connection() as conn:
             with conn.cursor() as cur:
-                # Шаблон SQL-запроса для массовой вставки/обновления
-                query_template = f"""
-                    INSERT INTO {POSTGRES_TABLE} (time, temperature)
-                    VALUES %s
-                    ON CONFLICT (time) DO UPDATE SET temperature = EXCLUDED.temperature;
-                """
-                
-                # Выполнение пакетной операции - САМАЯ ГЛАВНАЯ ЧАСТЬ
-                execute_values(cur, query_template, data_to_insert)
-                conn.commit()
-                logging.info(f"Успешно записано/обновлено {len(data_to_insert)} строк в БД.")
-
-    except psycopg2.Error as e:
-        logging.error(f"Ошибка при пакетной записи в БД: {e}")
\ No newline at end of file
+                cur.execute("SAVEPOINT bulk_insert")
+                try:
+                    with cur.copy(
+                        f"COPY {POSTGRES_TABLE_SQL} (time, temperature) "
+                        "FROM STDIN WITH (FORMAT BINARY)"
+                    ) as copy:
+                        copy.write(payload)
+                except UniqueViolation:
+                    cur.execute("ROLLBACK TO SAVEPOINT bulk_insert")
+                    cur.execute(
+                        f"CREATE TEMP TABLE _stg (LIKE {POSTGRES_TABLE_SQL}) ON COMMIT DROP"
+                    )
+                    with cur.copy(
+                        "COPY _stg (time, temperature) FROM STDIN WITH (FORMAT BINARY)"
+                    ) as copy:
+                        copy.write(payload)
+                    cur.execute(f"""
+                        INSERT INTO {POSTGRES_TABLE_SQL} (time, temperature)
+                        SELECT time, temperature FROM _stg
+                        ON CONFLICT (time) DO UPDATE SET temperature = EXCLUDED.temperature;
+                    """)
+                logging.info(f"Успешно записано/обновлено {len(temps)} строк в БД.")
+                return times[-1].astype('datetime64[us]').item()
+
+    except psycopg.Error as e:
+        logging.error(f"Ошибка при пакетной записи в БД: {e}")
+        return None
@@ -3,26 +3,51 @@
 import logging
 import time
 from datetime import datetime, timedelta, timezone
-import pytz
+from zoneinfo import ZoneInfo
 
 from meteostat import Point, Hourly
 
-from config import LOCATION_NAME, LAT, LON, DAYS_BACK, DELAY_MINUTES
+from config import (
+    LOCATION_NAME, LAT, LON, DAYS_BACK, DELAY_MINUTES, METEOSTAT_CACHE_DIR,
+)
 from db_writer import get_last_timestamp, write_data
 
-DB_TIMEZONE = pytz.timezone('Europe/Moscow')
+DB_TIMEZONE = ZoneInfo('Europe/Moscow')
+
+# Точка наблюдения не меняется между итерациями — создаем ее один раз
+POINT = Point(LAT, LON)
+
+# Настройка дискового кэша meteostat: библиотека скачивает годовые CSV-файлы
+# целиком даже ради одного-двух недостающих часов, поэтому кэшируем их и
+# обновляем не чаще раза в час (max_age в секундах).
+if METEOSTAT_CACHE_DIR:
+    Hourly.cache_dir = METEOSTAT_CACHE_DIR
+Hourly.max_age = 3600
+
+# Кэш последней временной метки в БД между итерациями: после успешной
+# записи она уже известна (ее возвращает write_data), и ходить в базу за
+# MAX(time) каждый цикл не нужно. None — метку нужно перечитать из БД
+# (первый запуск или предыдущая запись не удалась).
+_last_timestamp: datetime | None = None
 
 
 def run_parser() -> None:
     """
     Выполняет один цикл сбора данных, корректно обрабатывая часовые пояса.
     """
-    point = Point(LAT, LON)
-    last_timestamp_naive = get_last_timestamp()
-    end_date_utc = datetime.now(timezone.utc)
+    global _last_timestamp
+
+    # Один снимок часов на всю итерацию: все расчеты окна запроса
+    # отталкиваются от одного и того же момента времени
+    now_utc = datetime.now(timezone.utc)
+
+    if _last_timestamp is None:
+        _last_timestamp = get_last_timestamp()
+    last_timestamp_naive = _last_timestamp
+    end_date_utc = now_utc
 
     if last_timestamp_naive:
-        last_timestamp_aware = DB_TIMEZONE.localize(last_timestamp_naive)
+        last_timestamp_aware = last_timestamp_naive.replace(tzinfo=DB_TIMEZONE)
         start_date_utc = last_timestamp_aware.astimezone(timezone.utc) + timedelta(hours=1)
     else:
         start_date_utc = end_date_utc - timedelta(days=DAYS_BACK)
@@ -44,12 +69,24 @@ def run_parser() -> None:
         end_date_for_api = end_date_utc.replace(tzinfo=None)
 
         # Передаем в библиотеку наивные UTC-даты
-        data_source = Hourly(point, start_date_for_api, end_date_for_api)
+        data_source = Hourly(POINT, start_date_for_api, end_date_for_api)
         df = data_source.fetch()
 
+        # Meteostat часто возвращает полную часовую сетку, включая часы,
+        # которые уже есть в БД. Отбрасываем их на клиенте, сравнивая с
+        # последней записанной меткой: и индекс, и метка — наивное UTC-время,
+        # как оно хранится в таблице, поэтому сравнение убирает пересечение
+        # независимо от вычисленного окна запроса, и запись идет по быстрому
+        # пути без обработки конфликтов.
+        if not df.empty and last_timestamp_naive:
+            df = df[df.index > last_timestamp_naive]
+
         if not df.empty:
             logging.info(f"Получено {len(df)} новых записей для '{LOCATION_NAME}'.")
-            write_data(df)
+            # write_data возвращает новую верхнюю метку; если запись не
+            # удалась — сбрасываем кэш, и следующая итерация перечитает
+            # MAX(time) из базы
+            _last_timestamp = write_data(df)
         else:
             logging.info(f"API Meteostat не вернуло новых данных для '{LOCATION_NAME}' за указанный период.")
 
@@ -59,11 +96,15 @@ def run_parser() -> None:
 
 if __name__ == "__main__":
     logging.info("Сервис сбора погодных данных запущен.")
+    # Дедлайн по монотонным часам: цикл длится ровно DELAY_MINUTES,
+    # а не DELAY_MINUTES плюс время работы парсера, — без накопления дрейфа
+    next_run = time.monotonic()
     while True:
         try:
             run_parser()
         except Exception as e:
             logging.critical(f"Произошла критическая ошибка в главном цикле: {e}", exc_info=True)
-        
+
+        next_run += DELAY_MINUTES * 60
         logging.info(f"Следующий запуск через {DELAY_MINUTES} минут...\n")
-        time.sleep(DELAY_MINUTES * 60)
\ No newline at end of file
+        time.sleep(max(0.0, next_run - time.monotonic()))
\ No newline at end of file